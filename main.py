@@ -5,9 +5,35 @@ import os
 import math
 import asyncio
 import random
+import argparse
+import json
+import gc
+import tracemalloc
+import queue
+import threading
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
 
 # Constants
-pygame.init()
+# Frame export renders offscreen, in this process and in its workers
+if "--export" in sys.argv:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+# The mixer is left out here; AudioManager starts it behind the loading screen
+pygame.display.init()
+pygame.font.init()
 
 # Constants
 SCREEN_WIDTH = 800
@@ -33,6 +59,95 @@ DARK_GREEN = (0, 180, 0)
 GAME_RUNNING = 0
 GAME_OVER = 1
 
+# Session recording and frame export
+FPS = 60
+RECORDED_KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_UP, pygame.K_DOWN)
+
+# Garbage collection: larger young generation, fewer pauses during play
+GC_THRESHOLDS = (5000, 20, 20)
+
+# Session history
+SESSION_DB = "sessions.db"
+SESSION_BATCH_SIZE = 64  # sessions committed per transaction
+SESSION_WRITE_TIMEOUT = 1.0  # seconds to wait for another writer's lock
+SESSION_RETRY_INTERVAL = 2.0  # seconds between attempts to write held-back sessions
+LEADERBOARD_PAGE_SIZE = 10
+PLAYER_NAME_MAX = 16  # characters
+LEADERBOARD_TOP = "top"
+LEADERBOARD_HISTORY = "history"
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    player TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    badge TEXT NOT NULL,
+    choices TEXT NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_by_score ON sessions (score);
+CREATE INDEX IF NOT EXISTS sessions_by_player ON sessions (player);
+"""
+
+# Particle effects
+MAX_PARTICLES = 4096
+PARTICLE_SIZE = 8
+PARTICLE_FRAMES = 8
+PARTICLE_LEAF = 0
+PARTICLE_SMOKE = 1
+PARTICLE_SPARKLE = 2
+SMOKE_GREY = (120, 120, 120)
+SPARKLE_YELLOW = (255, 240, 120)
+PARTICLE_TILE = 32  # pixels; the particle layer is cleared and blitted in runs of tiles
+
+# Asset memory
+ASSET_MEMORY_BUDGET = 12 * 1024 * 1024  # bytes, sized for low-memory devices
+COLORKEY = (255, 0, 255)
+FORMAT_OPAQUE = "opaque"
+FORMAT_COLORKEY = "colorkey"
+FORMAT_PALETTE = "palette"
+FORMAT_ALPHA = "alpha"
+PALETTE_MAX_ERROR = 6  # mean per-channel error allowed when quantizing to 256 colours
+
+# Time-of-day lighting, one entry per day stage
+DAY_LIGHTING = {
+    "Morning": {"tint": (1.0, 0.97, 0.9), "warmth": 8, "darkness": 0.05, "window_light": (255, 235, 190), "window_strength": 0.5},
+    "Afternoon": {"tint": (1.0, 1.0, 1.0), "warmth": 0, "darkness": 0.0, "window_light": (255, 255, 230), "window_strength": 0.25},
+    "Evening": {"tint": (0.95, 0.82, 0.75), "warmth": 20, "darkness": 0.35, "window_light": (255, 170, 80), "window_strength": 0.8},
+}
+ROOM_WINDOWS = {"bedroom": (360, 70), "bathroom": (600, 160)}  # window centres in room pixels
+WINDOW_LIGHT_RADIUS = 160
+LIGHT_TRANSITION_FRAMES = 90
+LIGHT_KEYFRAMES = 2  # in-between lighting steps per cross-fade
+LIGHT_STRIP_HEIGHT = 40  # rows of the solid colour strip used to tint whole rooms
+BLEND_NAMES = {pygame.BLEND_RGB_ADD: "add", pygame.BLEND_RGB_SUB: "subtract", pygame.BLEND_RGB_MULT: "multiply"}
+
+# Audio
+AUDIO_FREQUENCY = 22050
+AUDIO_BUFFER = 512  # samples; smaller means lower cue latency
+AUDIO_CHANNELS = 8
+FOOTSTEP_INTERVAL = 16  # frames of walking between footsteps
+AMBIENCE_FILES = {
+    "bedroom": "bedroom_ambience.ogg",
+    "bathroom": "bathroom_ambience.ogg",
+    "kitchen": "kitchen_ambience.ogg",
+    "living_room": "living_room_ambience.ogg",
+}
+# cue name: priority, higher steals channels from lower
+CUE_PRIORITIES = {"tick": 0, "footstep": 1, "good_choice": 3, "bad_choice": 3}
+
+if np is not None:
+    # Aligned fields let NumPy work on them in place without staging buffers
+    PARTICLE_DTYPE = np.dtype([
+        ("x", np.float32),
+        ("y", np.float32),
+        ("vx", np.float32),
+        ("vy", np.float32),
+        ("life", np.int16),
+        ("max_life", np.int16),
+        ("kind", np.int8),
+    ], align=True)
+
 # Helper Functions
 def load_image(filepath, width=0, height=0):
     """Loads an image, handles errors, and optionally resizes it."""
@@ -62,16 +177,26 @@ def wrap_text(text, font, max_width):
         lines.append(' '.join(current_line))
     return lines
 
-async def main():
-        game = Game()
+async def main(record_path=None, profile=False, gc_tuning=True):
+        sessions = SessionStore() if sqlite3 is not None else None
+        game = Game(sessions)
+        recorded_frames = []
+        profiler = FrameProfiler(game) if profile else None
         
         # Show initial loading screen
         game.draw_loading_screen(0)
         
+        # Start audio while the loading screen is up, not on the first gameplay frame
+        game.audio.ensure_mixer()
+
         # Simulate loading progress
         for i in range(0, 101, 5):
             game.draw_loading_screen(i)
             await asyncio.sleep(0.1)  # Short delay between progress updates
+
+        # Everything loaded so far lives for the whole game; keep the GC off it
+        if gc_tuning:
+            tune_gc()
         
         # Run the game
         try:
@@ -79,20 +204,28 @@ async def main():
             running = True
             while running:
                 # Handle events
+                pressed = []
                 for event in pygame.event.get():
                     if event.type == pygame.QUIT:
                         running = False
                     else:
+                        if event.type == pygame.KEYDOWN:
+                            pressed.append([event.key, event.unicode])
                         game.handle_event(event)
                 
                 # Update game state
-                game.update()
+                keys = pygame.key.get_pressed()
+                if record_path:
+                    recorded_frames.append({"keys": [key for key in RECORDED_KEYS if keys[key]], "events": pressed})
+                game.update(keys)
                 
                 # Render game
                 game.render()
+                if profiler:
+                    profiler.end_frame()
                 
                 # Cap the frame rate
-                game.clock.tick(60)
+                game.clock.tick(FPS)
                 
                 # Required for web deployment
                 await asyncio.sleep(0)
@@ -100,8 +233,35 @@ async def main():
         except Exception as e:
             print(f"Error: {e}")
         finally:
+            if profiler:
+                profiler.stop()
+            if record_path:
+                save_session(record_path, recorded_frames, game.particles.seed, sessions is not None)
+            if sessions:
+                game.store_unsaved_session()
+                sessions.close()
             pygame.quit()
 
+def tune_gc(thresholds=GC_THRESHOLDS):
+    """Moves all current objects to the permanent generation and raises the collection thresholds."""
+    gc.collect()
+    gc.freeze()
+    gc.set_threshold(*thresholds)
+
+def save_session(filepath, frames, seed, sessions=False):
+    """Writes recorded per-frame input to a session file for replay or export.
+
+    `sessions` records whether the game had a session store, which decides
+    whether game over asks for a name and L opens the leaderboard.
+    """
+    with open(filepath, "w") as f:
+        json.dump({"seed": seed, "sessions": sessions, "frames": frames}, f)
+    print(f"Recorded {len(frames)} frames to {filepath}")
+
+def load_session(filepath):
+    with open(filepath) as f:
+        return json.load(f)
+
 # Classes
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y, image):
@@ -137,8 +297,884 @@ class Room:
     def add_interaction_point(self, x, y, name, text, options):
         self.interaction_points.append(InteractionPoint(x, y, name, text, options))
 
-class Game:
+class ParticleSystem:
+    """Pooled particle effects stored in a NumPy structured array.
+
+    Particles live in world coordinates and are updated with vectorized
+    operations into preallocated scratch arrays. Drawing stamps sprites from
+    a pre-rendered sheet into a layer in the display's pixel format, and
+    only the tiles that hold particles are cleared and blitted, so nothing
+    is allocated per particle. Without NumPy the system is disabled and
+    does nothing.
+    """
+    # kind: (gravity, drag, life range, speed range, angle range, spread)
+    KINDS = {
+        PARTICLE_LEAF: (0.06, 0.97, (40, 80), (1.5, 4.0), (-2.6, -0.5), 20),
+        PARTICLE_SMOKE: (-0.04, 0.95, (50, 90), (0.3, 1.5), (-2.0, -1.1), 15),
+        PARTICLE_SPARKLE: (0.0, 0.92, (20, 45), (1.0, 5.0), (-math.pi, math.pi), 10),
+    }
+
+    def __init__(self, capacity=MAX_PARTICLES, seed=None):
+        self.capacity = capacity
+        self.seed = random.randrange(2**32) if seed is None else seed
+        self.count = 0
+        self.enabled = np is not None
+        self.build_sprite_sheet()
+        if not self.enabled:
+            return
+
+        # Compaction scatters survivors into the spare pool; its extra slot takes the dead
+        self.particles = np.zeros(capacity + 1, dtype=PARTICLE_DTYPE)
+        self.spare = np.zeros(capacity + 1, dtype=PARTICLE_DTYPE)
+        self.rng = np.random.default_rng(self.seed)
+
+        # Per-kind lookup tables indexed by the particle's kind field
+        kinds = sorted(self.KINDS)
+        self.gravity = np.array([self.KINDS[k][0] for k in kinds], dtype=np.float32)
+        self.drag = np.array([self.KINDS[k][1] for k in kinds], dtype=np.float32)
+
+        self.build_draw_buffers()
+
+    def build_sprite_sheet(self):
+        """Pre-renders every kind at every fade level into one sheet, one row per kind."""
+        size = PARTICLE_SIZE
+        half = size // 2
+        self.sheet = pygame.Surface((size * PARTICLE_FRAMES, size * len(self.KINDS)), pygame.SRCALPHA)
+        for kind in sorted(self.KINDS):
+            for frame in range(PARTICLE_FRAMES):
+                alpha = int(255 * (frame + 1) / PARTICLE_FRAMES)
+                cell = pygame.Rect(frame * size, kind * size, size, size)
+                if kind == PARTICLE_LEAF:
+                    pygame.draw.ellipse(self.sheet, LIME_GREEN + (alpha,), cell.inflate(0, -half))
+                    pygame.draw.line(self.sheet, DARK_GREEN + (alpha,), cell.midleft, cell.midright, 1)
+                elif kind == PARTICLE_SMOKE:
+                    pygame.draw.circle(self.sheet, SMOKE_GREY + (alpha // 2,), cell.center, half)
+                else:
+                    pygame.draw.line(self.sheet, SPARKLE_YELLOW + (alpha,), cell.midtop, cell.midbottom, 2)
+                    pygame.draw.line(self.sheet, SPARKLE_YELLOW + (alpha,), cell.midleft, cell.midright, 2)
+
+    def build_draw_buffers(self):
+        """Allocates everything update() and draw() write into, so they allocate nothing per particle."""
+        size = PARTICLE_SIZE
+        sprites = len(self.KINDS) * PARTICLE_FRAMES
+
+        # Particle layer in the display's format, with a sprite-sized margin so
+        # off-screen stamps need no bounds checks. 32-bit rows are never padded,
+        # so a pixel's flat index is y * width + x.
+        self.layer_width = SCREEN_WIDTH + 2 * size
+        self.layer_height = SCREEN_HEIGHT + 2 * size
+        self.layer = pygame.Surface((self.layer_width, self.layer_height), pygame.SRCALPHA).convert_alpha()
+        self.layer.fill((0, 0, 0, 0))
+        self.visible = pygame.Rect(size, size, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+        # Sheet cells in the layer's format as (pixel, sprite) tables of packed values
+        # and opaque masks. Everything per particle is laid out pixel-major so NumPy's
+        # inner loops run over particles and need no temporary buffers.
+        sheet = self.sheet.convert_alpha()
+        cells = (len(self.KINDS), size, PARTICLE_FRAMES, size)
+        packed = pygame.surfarray.array2d(sheet).T.reshape(cells).transpose(1, 3, 0, 2)
+        self.sprite_pixels = np.ascontiguousarray(packed.reshape(size * size, sprites), dtype=np.uint32)
+        alpha = pygame.surfarray.array_alpha(sheet).T.reshape(cells).transpose(1, 3, 0, 2)
+        self.sprite_opaque = np.ascontiguousarray(alpha.reshape(size * size, sprites) > 0)
+
+        # Pixel offsets of a sprite relative to its top-left corner in the layer
+        rows, cols = np.divmod(np.arange(size * size), size)
+        self.sprite_offsets = (rows * self.layer_width + cols).astype(np.intp)[:, None]
+
+        # Tiles touched by a sprite this frame, and the layer rects drawn last frame
+        self.tile_cols = -(-self.layer_width // PARTICLE_TILE)
+        self.tiles = np.zeros((-(-self.layer_height // PARTICLE_TILE), self.tile_cols), dtype=bool)
+        self.tiles_flat = self.tiles.reshape(-1)
+        self.dirty_rects = []
+
+        # Per-particle scratch space
+        self.scratch_float = np.empty(self.capacity, dtype=np.float32)
+        self.scratch_x = np.empty(self.capacity, dtype=np.intp)
+        self.scratch_y = np.empty(self.capacity, dtype=np.intp)
+        self.scratch_sprite = np.empty(self.capacity, dtype=np.intp)
+        self.scratch_kind = np.empty(self.capacity, dtype=np.intp)
+        self.scratch_tile = np.empty(self.capacity, dtype=np.intp)
+        self.scratch_index = np.empty(size * size * self.capacity, dtype=np.intp)
+        self.scratch_mask = np.empty(size * size * self.capacity, dtype=bool)
+        self.scratch_pixels = np.empty(size * size * self.capacity, dtype=np.uint32)
+
+    def emit(self, kind, x, y, amount):
+        """Spawns up to `amount` particles of `kind` around world position (x, y)."""
+        if not self.enabled:
+            return
+        amount = min(amount, self.capacity - self.count)
+        if amount <= 0:
+            return
+
+        gravity, drag, life, speed, angle, spread = self.KINDS[kind]
+        new = self.particles[self.count:self.count + amount]
+        angles = self.rng.uniform(angle[0], angle[1], amount)
+        speeds = self.rng.uniform(speed[0], speed[1], amount)
+        new["x"] = x + self.rng.uniform(-spread, spread, amount)
+        new["y"] = y + self.rng.uniform(-spread, spread, amount)
+        new["vx"] = np.cos(angles) * speeds
+        new["vy"] = np.sin(angles) * speeds
+        new["max_life"] = self.rng.integers(life[0], life[1], amount)
+        new["life"] = new["max_life"]
+        new["kind"] = kind
+        self.count += amount
+
+    def update(self):
+        """Advances all live particles by one frame and drops the expired ones."""
+        if self.count == 0:
+            return
+
+        n = self.count
+        live = self.particles[:n]
+        vx = live["vx"]
+        vy = live["vy"]
+
+        # Per-kind gravity and drag, looked up into scratch space
+        kinds = self.scratch_kind[:n]
+        np.copyto(kinds, live["kind"], casting="unsafe")
+        factor = self.scratch_float[:n]
+        np.take(self.gravity, kinds, out=factor, mode="clip")
+        vy += factor
+        np.take(self.drag, kinds, out=factor, mode="clip")
+        vx *= factor
+        vy *= factor
+        live["x"] += vx
+        live["y"] += vy
+        live["life"] -= 1
+
+        # Compact survivors to the front so the live range stays contiguous: each
+        # survivor goes to its rank among survivors, the dead to the spare slot
+        alive = self.scratch_mask[:n]
+        np.greater(live["life"], 0, out=alive)
+        alive_count = int(np.count_nonzero(alive))
+        if alive_count < n:
+            slots = self.scratch_index[:n]
+            np.copyto(slots, alive, casting="unsafe")
+            np.add.accumulate(slots, out=slots)
+            slots -= 1
+            np.logical_not(alive, out=alive)
+            np.copyto(slots, self.capacity, where=alive)
+            self.spare[slots] = live
+            self.particles, self.spare = self.spare, self.particles
+            self.count = alive_count
+
+    def draw(self, surface, camera_x):
+        """Stamps all particles into the layer and blits the tiles that hold them."""
+        if self.count == 0:
+            return
+
+        n = self.count
+        live = self.particles[:n]
+        size = PARTICLE_SIZE
+        half = size // 2
+
+        # Sprite top-left corners in layer coordinates, clamped into the margin
+        xs = self.scratch_x[:n]
+        ys = self.scratch_y[:n]
+        fx = self.scratch_float[:n]
+        np.subtract(live["x"], camera_x + half - size, out=fx)
+        np.clip(fx, 0, SCREEN_WIDTH + size, out=fx)
+        np.copyto(xs, fx, casting="unsafe")
+        np.subtract(live["y"], half - size, out=fx)
+        np.clip(fx, 0, SCREEN_HEIGHT + size, out=fx)
+        np.copyto(ys, fx, casting="unsafe")
+
+        # Fade level follows remaining life; sprite index selects the sheet cell
+        # Fields are widened into scratch space first, as mixed-type ufuncs buffer their inputs
+        sprite = self.scratch_sprite[:n]
+        max_life = self.scratch_tile[:n]
+        kind_base = self.scratch_kind[:n]
+        np.copyto(sprite, live["life"], casting="unsafe")
+        np.copyto(max_life, live["max_life"], casting="unsafe")
+        np.copyto(kind_base, live["kind"], casting="unsafe")
+        sprite *= PARTICLE_FRAMES - 1
+        sprite //= max_life
+        kind_base *= PARTICLE_FRAMES
+        sprite += kind_base
+
+        # Mark every tile a sprite touches; tiles are at least a sprite wide, so its corners cover them
+        self.tiles_flat[:] = False
+        tiles = self.scratch_tile[:n]
+        corner = self.scratch_kind[:n]
+        for dy in (0, size - 1):
+            for dx in (0, size - 1):
+                np.add(ys, dy, out=tiles)
+                np.floor_divide(tiles, PARTICLE_TILE, out=tiles)
+                np.multiply(tiles, self.tile_cols, out=tiles)
+                np.add(xs, dx, out=corner)
+                np.floor_divide(corner, PARTICLE_TILE, out=corner)
+                np.add(tiles, corner, out=tiles)
+                self.tiles_flat[tiles] = True
+
+        # Clear what was drawn last frame
+        for rect in self.dirty_rects:
+            self.layer.fill((0, 0, 0, 0), rect)
+        self.dirty_rects = self.tile_rects()
+
+        # Stamp every sprite's opaque pixels; transparent ones are sent to pixel 0,
+        # which sits in the hidden margin. The pixel view locks the layer, so it is
+        # only held while stamping.
+        pixel_count = size * size
+        index = self.scratch_index[:pixel_count * n].reshape(pixel_count, n)
+        np.multiply(ys, self.layer_width, out=ys)
+        np.add(ys, xs, out=ys)
+        np.add(ys, self.sprite_offsets, out=index)
+        mask = self.scratch_mask[:pixel_count * n].reshape(pixel_count, n)
+        np.take(self.sprite_opaque, sprite, axis=1, out=mask, mode="clip")
+        np.logical_not(mask, out=mask)
+        np.copyto(index, 0, where=mask)
+        pixels = self.scratch_pixels[:pixel_count * n].reshape(pixel_count, n)
+        np.take(self.sprite_pixels, sprite, axis=1, out=pixels, mode="clip")
+        view = pygame.surfarray.pixels2d(self.layer)
+        view.T.reshape(-1)[index] = pixels
+        del view
+
+        blits = []
+        for rect in self.dirty_rects:
+            area = rect.clip(self.visible)
+            if area:
+                blits.append((self.layer, (area.x - size, area.y - size), area))
+        surface.blits(blits, doreturn=False)
+
+    def tile_rects(self):
+        """Returns one layer rect per horizontal run of marked tiles."""
+        rects = []
+        tile = PARTICLE_TILE
+        for row in np.flatnonzero(self.tiles.any(axis=1)).tolist():
+            start = None
+            for col, marked in enumerate(self.tiles[row].tolist() + [False]):
+                if marked and start is None:
+                    start = col
+                elif not marked and start is not None:
+                    rects.append(pygame.Rect(start * tile, row * tile, (col - start) * tile, tile))
+                    start = None
+        return rects
+
+    def clear(self):
+        self.count = 0
+        if self.enabled:
+            for rect in self.dirty_rects:
+                self.layer.fill((0, 0, 0, 0), rect)
+            self.dirty_rects = []
+
+class AssetManager:
+    """Stores every surface in the cheapest format that preserves it and tracks memory use.
+
+    Fully opaque images are converted to the display format, images with
+    only on/off transparency use a colorkey, small pixel art with at most
+    256 colours is palettized to 8 bits, and only images with real
+    translucency keep per-pixel alpha. If an opaque asset would push the
+    total over the budget it is quantized to 256 colours; when that loses
+    too much detail (or NumPy is missing) the asset is kept as it is and
+    reported as over budget.
+    """
+    def __init__(self, budget=ASSET_MEMORY_BUDGET):
+        self.budget = budget
+        self.assets = {}
+        self.over_budget = []
+        self.blit_costs = None
+
+    def load(self, name, filepath, width=0, height=0, category="sprite"):
+        """Loads an image through load_image and stores it in its cheapest format."""
+        return self.add(name, load_image(filepath, width, height), category)
+
+    def add(self, name, surface, category="sprite", fmt=None, blend=0):
+        """Stores a surface under `name`, picking its format and enforcing the budget.
+
+        Callers that built a surface in its final format pass `fmt` to store
+        it as-is, skipping the pixel scan in optimize. Surfaces drawn with a
+        blend mode pass its flag as `blend` so their blit cost is measured
+        the way they are drawn.
+        """
+        lossy_ok = fmt is None
+        if fmt is None:
+            surface, fmt = self.optimize(surface, category)
+        self.remove(name)
+        if self.total_bytes() + self.surface_bytes(surface) > self.budget and fmt == FORMAT_OPAQUE and lossy_ok:
+            palettized = self.palettize(surface, lossy=True)
+            if palettized is not None:
+                print(f"Asset budget exceeded, quantized {name} to 256 colours")
+                surface, fmt = palettized, FORMAT_PALETTE
+        if self.total_bytes() + self.surface_bytes(surface) > self.budget:
+            print(f"Asset budget exceeded by {name}: {self.total_bytes() + self.surface_bytes(surface)} bytes")
+            self.over_budget.append(name)
+        self.assets[name] = {"surface": surface, "format": fmt, "category": category, "blend": blend}
+        return surface
+
+    def optimize(self, surface, category):
+        """Returns (surface, format) for the cheapest lossless representation of `surface`."""
+        if not surface.get_flags() & pygame.SRCALPHA:
+            return self.opaque_or_palette(surface, category)
+        if np is None:
+            # Without NumPy the pixels can't be inspected cheaply, so trust the category
+            if category == "room":
+                return surface.convert(), FORMAT_OPAQUE
+            return surface, FORMAT_ALPHA
+
+        alpha = pygame.surfarray.pixels_alpha(surface)
+        opaque = bool((alpha == 255).all())
+        binary = opaque or bool(((alpha == 0) | (alpha == 255)).all())
+        del alpha  # release the pixel lock
+        if opaque:
+            return self.opaque_or_palette(surface, category)
+        if binary:
+            keyed = surface.copy()
+            pixels = pygame.surfarray.pixels3d(keyed)
+            pixels[pygame.surfarray.pixels_alpha(keyed) == 0] = COLORKEY
+            del pixels
+            keyed = keyed.convert()
+            keyed.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            return keyed, FORMAT_COLORKEY
+        return surface, FORMAT_ALPHA
+
+    def opaque_or_palette(self, surface, category):
+        # Room backgrounds are photos-in-pixels; only sprites are worth palettizing
+        if category == "room":
+            return surface.convert(), FORMAT_OPAQUE
+        palettized = self.palettize(surface)
+        if palettized is None:
+            return surface.convert(), FORMAT_OPAQUE
+        return palettized, FORMAT_PALETTE
+
+    def palettize(self, surface, lossy=False):
+        """Returns an 8-bit copy of an opaque surface with an explicit palette, or None.
+
+        Images with at most 256 colours are kept exactly. With `lossy`, images
+        get the 256 most common colours (after trimming each channel to 4
+        bits) instead; the result is read back and rejected if it is off by more
+        than PALETTE_MAX_ERROR per channel on average.
+        """
+        if np is None:
+            return None
+
+        rgb = pygame.surfarray.array3d(surface)
+        bins = ((rgb[..., 0] >> 4).astype(np.intp) << 8) | ((rgb[..., 1] >> 4).astype(np.intp) << 4) | (rgb[..., 2] >> 4)
+        bins = bins.reshape(-1)
+        counts = np.bincount(bins, minlength=4096)
+        used = np.flatnonzero(counts)
+        if not lossy:
+            # Every used bin holds at least one distinct colour, so only sort the pixels when it can pay off
+            if len(used) > 256:
+                return None
+            packed = (rgb[..., 0].astype(np.uint32) << 16) | (rgb[..., 1].astype(np.uint32) << 8) | rgb[..., 2]
+            colors, indices = np.unique(packed, return_inverse=True)
+            if len(colors) > 256:
+                return None
+            palette = np.stack([(colors >> 16) & 255, (colors >> 8) & 255, colors & 255], axis=1)
+        else:
+            # Popularity quantizer: the busiest 4-bit bins, each represented by its mean
+            # colour, which is exact when there are at most 256 single-colour bins
+            sums = np.stack([np.bincount(bins, weights=rgb[..., c].reshape(-1), minlength=4096) for c in range(3)], axis=1)
+            means = sums / np.maximum(counts, 1)[:, None]
+            chosen = used[np.argsort(counts[used])[::-1][:256]]
+            palette = means[chosen]
+
+            # Map every used bin to its nearest palette colour
+            distances = ((means[used, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+            nearest = np.zeros(4096, dtype=np.intp)
+            nearest[used] = distances.argmin(axis=1)
+            indices = nearest[bins]
+            palette = np.rint(palette).astype(np.intp)
+
+        palettized = pygame.Surface(surface.get_size(), 0, 8)
+        palettized.set_palette([tuple(color) for color in palette.tolist()])
+        pygame.surfarray.blit_array(palettized, indices.reshape(rgb.shape[:2]).astype(np.uint8))
+
+        # Make sure the pixels survived the round trip
+        error = np.abs(pygame.surfarray.array3d(palettized).astype(np.int16) - rgb).mean()
+        if error > (PALETTE_MAX_ERROR if lossy else 0):
+            return None
+        return palettized
+
+    def panel(self, width, height, color, alpha=None):
+        """Returns a cached bordered HUD panel instead of building a new surface every frame."""
+        name = f"panel_{width}x{height}_{color}_{alpha}"
+        if name not in self.assets:
+            panel = pygame.Surface((width, height)).convert()
+            panel.fill(color)
+            pygame.draw.rect(panel, WHITE, (0, 0, width, height), 2)
+            if alpha is not None:
+                panel.set_alpha(alpha)
+            self.assets[name] = {"surface": panel, "format": FORMAT_OPAQUE, "category": "hud", "blend": 0}
+        return self.assets[name]["surface"]
+
+    def remove(self, name):
+        self.assets.pop(name, None)
+        if name in self.over_budget:
+            self.over_budget.remove(name)
+
+    def surface_bytes(self, surface):
+        size = surface.get_pitch() * surface.get_height()
+        if surface.get_bitsize() == 8:
+            size += 256 * 4  # palette
+        return size
+
+    def total_bytes(self):
+        return sum(self.surface_bytes(asset["surface"]) for asset in self.assets.values())
+
+    def blit_kind(self, fmt, blend):
+        """Returns the blit_costs key for a format drawn with `blend`."""
+        return f"{fmt} {BLEND_NAMES[blend]}" if blend else fmt
+
+    def measure_blit_costs(self, target, size=(ROOM_WIDTH, SCREEN_HEIGHT), repeats=20):
+        """Times a full blit of each surface format onto `target`, in microseconds per megapixel.
+
+        Every blend mode a stored asset is drawn with is timed too, since
+        blended blits take different paths from plain ones.
+        """
+        source = pygame.Surface(size, pygame.SRCALPHA)
+        source.fill(PASTEL_PINK + (128,))
+        samples = {FORMAT_ALPHA: source, FORMAT_OPAQUE: source.convert(), FORMAT_PALETTE: source.convert(8)}
+        samples[FORMAT_COLORKEY] = source.convert()
+        samples[FORMAT_COLORKEY].set_colorkey(COLORKEY, pygame.RLEACCEL)
+        kinds = {(fmt, 0) for fmt in samples}
+        kinds.update((asset["format"], asset["blend"]) for asset in self.assets.values())
+
+        megapixels = size[0] * size[1] / 1e6
+        self.blit_costs = {}
+        for fmt, blend in sorted(kinds):
+            sample = samples[fmt]
+            target.blit(sample, (0, 0), special_flags=blend)  # warm up (builds the RLE encoding)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                target.blit(sample, (0, 0), special_flags=blend)
+            self.blit_costs[self.blit_kind(fmt, blend)] = (time.perf_counter() - start) / repeats / megapixels * 1e6
+        return self.blit_costs
+
+    def memory_report(self):
+        """Returns bytes per asset and category, plus blit cost per format if measured."""
+        assets = {}
+        categories = {}
+        for name, asset in self.assets.items():
+            surface = asset["surface"]
+            size = self.surface_bytes(surface)
+            assets[name] = {
+                "category": asset["category"],
+                "format": asset["format"],
+                "size": surface.get_size(),
+                "bytes": size,
+            }
+            kind = self.blit_kind(asset["format"], asset["blend"])
+            if self.blit_costs and kind in self.blit_costs:
+                megapixels = surface.get_width() * surface.get_height() / 1e6
+                assets[name]["blit_us"] = self.blit_costs[kind] * megapixels
+            categories[asset["category"]] = categories.get(asset["category"], 0) + size
+        return {
+            "total_bytes": sum(categories.values()),
+            "budget": self.budget,
+            "categories": categories,
+            "assets": assets,
+            "blit_us_per_megapixel": self.blit_costs,
+            "over_budget": list(self.over_budget),
+        }
+
+    def print_memory_report(self):
+        report = self.memory_report()
+        print(f"Asset memory: {report['total_bytes'] / 1024:.1f} KiB of {report['budget'] / 1024:.1f} KiB")
+        for category, size in sorted(report["categories"].items()):
+            print(f"  {category}: {size / 1024:.1f} KiB")
+        for name, asset in sorted(report["assets"].items()):
+            line = f"  {name}: {asset['format']} {asset['size'][0]}x{asset['size'][1]} {asset['bytes'] / 1024:.1f} KiB"
+            if "blit_us" in asset:
+                line += f", {asset['blit_us']:.0f} us/blit"
+            print(line)
+        if report["over_budget"]:
+            print(f"  over budget: {', '.join(report['over_budget'])}")
+        if report["blit_us_per_megapixel"]:
+            for fmt, cost in report["blit_us_per_megapixel"].items():
+                print(f"  blit {fmt}: {cost:.0f} us/megapixel")
+
+class DayLighting:
+    """Per-stage room lighting, applied only to the rooms on screen.
+
+    A stage's lighting is a per-channel multiply and offset plus an additive
+    window glow, all applied with blend blits. Rooms are kept unquantized at
+    their native size and lit into two reusable display-format canvases,
+    one per room that can be on screen at once, so drawing is one opaque
+    blit. A room is relit only when it comes into view or the light
+    changes. Cross-fades step through a few keyframes that interpolate the
+    multiply and offset, which matches blending the two lit images.
+    """
+    def __init__(self, assets, room_imgs, stages):
+        self.assets = assets
+        self.sources = room_imgs
+        self.stage_lights = [self.light_params(DAY_LIGHTING[stage]) for stage in stages]
+
+        size = (ROOM_WIDTH, SCREEN_HEIGHT)
+        self.canvases = []
+        for index in range(2):
+            canvas = self.assets.add(f"lit_room_{index}", pygame.Surface(size).convert(), "lighting", FORMAT_OPAQUE)
+            self.canvases.append({"surface": canvas, "room": None, "key": None, "drawn": 0})
+        self.draws = 0
+
+        # Solid colour blitted in strips, because blend blits are much faster than blend fills
+        strip = pygame.Surface((ROOM_WIDTH, LIGHT_STRIP_HEIGHT)).convert()
+        self.strip = self.assets.add("light_strip", strip, "lighting", FORMAT_OPAQUE, pygame.BLEND_RGB_MULT)
+        glow = self.build_glow().convert()
+        self.glow = self.assets.add("window_glow", glow, "lighting", FORMAT_OPAQUE)
+        self.window_light = self.assets.add("window_light", glow.copy(), "lighting", FORMAT_OPAQUE, pygame.BLEND_RGB_ADD)
+
+        self.stage = 0
+        self.from_stage = 0
+        self.transition_frame = LIGHT_TRANSITION_FRAMES
+
+    def light_params(self, lighting):
+        """Returns (multiply, add, subtract, window) colours as float triples for a DAY_LIGHTING entry."""
+        keep = 1 - lighting["darkness"]
+        warmth = lighting["warmth"]
+        multiply = [min(255.0, 255 * tint * keep) for tint in lighting["tint"]]
+        offset = [warmth * keep, warmth / 3 * keep, -warmth * keep]
+        add = [max(value, 0) for value in offset]
+        subtract = [max(-value, 0) for value in offset]
+        window = [channel * lighting["window_strength"] for channel in lighting["window_light"]]
+        return multiply, add, subtract, window
+
+    def build_glow(self):
+        """Radial white falloff used as the window light mask."""
+        size = WINDOW_LIGHT_RADIUS * 2
+        glow = pygame.Surface((size, size))
+        for radius in range(WINDOW_LIGHT_RADIUS, 0, -4):
+            level = int(255 * (1 - radius / WINDOW_LIGHT_RADIUS) ** 2)
+            pygame.draw.circle(glow, (level, level, level), (WINDOW_LIGHT_RADIUS, WINDOW_LIGHT_RADIUS), radius)
+        return glow
+
+    def update(self, day_stage):
+        """Starts a cross-fade when the day stage changes and advances the current one."""
+        day_stage = min(day_stage, len(self.stage_lights) - 1)
+        if day_stage != self.stage:
+            self.from_stage = self.stage
+            self.stage = day_stage
+            self.transition_frame = 0
+        elif self.transition_frame < LIGHT_TRANSITION_FRAMES:
+            self.transition_frame += 1
+
+    def reset(self, day_stage=0):
+        self.stage = self.from_stage = day_stage
+        self.transition_frame = LIGHT_TRANSITION_FRAMES
+
+    def fade_step(self):
+        """Returns the keyframe the fade is snapped to, 0 for the old stage or LIGHT_KEYFRAMES + 1 for the new one."""
+        if self.transition_frame >= LIGHT_TRANSITION_FRAMES:
+            return LIGHT_KEYFRAMES + 1
+        return round(self.transition_frame / LIGHT_TRANSITION_FRAMES * (LIGHT_KEYFRAMES + 1))
+
+    def light_key(self):
+        """Returns the stage index, or (from, to, step) for a keyframe of a cross-fade."""
+        step = self.fade_step()
+        if step == 0:
+            return self.from_stage
+        if step > LIGHT_KEYFRAMES:
+            return self.stage
+        return (self.from_stage, self.stage, step)
+
+    def draw(self, surface, room_name, x):
+        """Draws the lit background for `room_name` at the current point of the day."""
+        key = self.light_key()
+        canvas = None
+        for candidate in self.canvases:
+            if candidate["room"] == room_name:
+                canvas = candidate
+                break
+        if canvas is None:
+            # Reuse the canvas of the room that left the screen
+            canvas = min(self.canvases, key=lambda candidate: candidate["drawn"])
+            canvas["room"] = room_name
+            canvas["key"] = None
+        if canvas["key"] != key:
+            self.light_room(canvas["surface"], room_name, key)
+            canvas["key"] = key
+
+        self.draws += 1
+        canvas["drawn"] = self.draws
+        surface.blit(canvas["surface"], (x, 0))
+
+    def light_room(self, canvas, room_name, key):
+        """Scales the room into `canvas` and applies the lighting for `key`."""
+        if isinstance(key, tuple):
+            start = self.stage_lights[key[0]]
+            end = self.stage_lights[key[1]]
+            blend = key[2] / (LIGHT_KEYFRAMES + 1)
+            params = [[a + (b - a) * blend for a, b in zip(first, second)] for first, second in zip(start, end)]
+        else:
+            params = self.stage_lights[key]
+        multiply, add, subtract, window = ([int(round(value)) for value in color] for color in params)
+
+        pygame.transform.scale(self.sources[room_name], canvas.get_size(), canvas)
+        if multiply != [255, 255, 255]:
+            self.tint(canvas, multiply, pygame.BLEND_RGB_MULT)
+        if any(add):
+            self.tint(canvas, add, pygame.BLEND_RGB_ADD)
+        if any(subtract):
+            self.tint(canvas, subtract, pygame.BLEND_RGB_SUB)
+
+        position = ROOM_WINDOWS.get(room_name)
+        if position:
+            self.window_light.blit(self.glow, (0, 0))
+            self.tint(self.window_light, window, pygame.BLEND_RGB_MULT)
+            corner = (position[0] - WINDOW_LIGHT_RADIUS, position[1] - WINDOW_LIGHT_RADIUS)
+            canvas.blit(self.window_light, corner, special_flags=pygame.BLEND_RGB_ADD)
+
+    def tint(self, target, color, special_flags):
+        """Blends a solid colour over all of `target`."""
+        self.strip.fill(color)
+        width = min(target.get_width(), ROOM_WIDTH)
+        for y in range(0, target.get_height(), LIGHT_STRIP_HEIGHT):
+            target.blit(self.strip, (0, y), (0, 0, width, LIGHT_STRIP_HEIGHT), special_flags)
+
+class AudioManager:
+    """Sound cues played from a fixed channel pool, plus streamed room ambience.
+
+    The mixer is started during the loading screen, or on the first request
+    by code that skips it, and short cues are synthesized once into
+    in-memory Sounds at the same time. When every channel is busy a cue
+    steals the channel with the lowest priority at or below its own.
+    Ambience is streamed with mixer.music rather than decoded into memory.
+    """
     def __init__(self):
+        self.enabled = None  # unknown until the mixer is first needed
+        self.cues = {}
+        self.channels = []
+        self.channel_priorities = []
+        self.ambience_room = None
+        self.latencies = deque(maxlen=120)
+
+    def ensure_mixer(self):
+        """Starts the mixer and preloads every cue; returns False if audio is unavailable."""
+        if self.enabled is not None:
+            return self.enabled
+        try:
+            pygame.mixer.init(AUDIO_FREQUENCY, -16, 1, AUDIO_BUFFER)
+        except pygame.error as message:
+            print(f"Audio disabled: {message}")
+            self.enabled = False
+            return False
+
+        pygame.mixer.set_num_channels(AUDIO_CHANNELS)
+        self.channels = [pygame.mixer.Channel(i) for i in range(AUDIO_CHANNELS)]
+        self.channel_priorities = [0] * AUDIO_CHANNELS
+        self.cues = {
+            "footstep": self.synthesize([(0, 0.05)], noise=True, volume=0.25),
+            "tick": self.synthesize([(1800, 0.015)], volume=0.15),
+            "good_choice": self.synthesize([(523, 0.09), (659, 0.09), (784, 0.16)]),
+            "bad_choice": self.synthesize([(392, 0.11), (311, 0.11), (262, 0.2)]),
+        }
+        self.enabled = True
+        return True
+
+    def synthesize(self, notes, noise=False, volume=0.4):
+        """Builds a Sound from (frequency, seconds) notes with a decaying envelope."""
+        frequency, _, channels = pygame.mixer.get_init()
+        if np is not None:
+            parts = []
+            for pitch, duration in notes:
+                length = int(frequency * duration)
+                envelope = volume * (1 - np.arange(length) / length) ** 2
+                if noise:
+                    value = np.random.uniform(-1, 1, length)
+                else:
+                    value = np.sin(2 * np.pi * pitch * np.arange(length) / frequency)
+                parts.append((32767 * envelope * value).astype(np.int16))
+            samples = np.repeat(np.concatenate(parts), channels)
+            return pygame.mixer.Sound(buffer=samples.tobytes())
+
+        samples = array("h")
+        for pitch, duration in notes:
+            length = int(frequency * duration)
+            for i in range(length):
+                envelope = volume * (1 - i / length) ** 2
+                if noise:
+                    value = random.uniform(-1, 1)
+                else:
+                    value = math.sin(2 * math.pi * pitch * i / frequency)
+                sample = int(32767 * envelope * value)
+                samples.extend([sample] * channels)
+        return pygame.mixer.Sound(buffer=samples.tobytes())
+
+    def play(self, cue):
+        """Plays a preloaded cue, stealing a lower-priority channel if the pool is full."""
+        if not self.ensure_mixer():
+            return
+        start = time.perf_counter()
+        priority = CUE_PRIORITIES[cue]
+
+        # Prefer an idle channel, otherwise the lowest-priority busy one
+        index = None
+        for i, channel in enumerate(self.channels):
+            if not channel.get_busy():
+                index = i
+                break
+        if index is None:
+            lowest = min(range(len(self.channels)), key=self.channel_priorities.__getitem__)
+            if self.channel_priorities[lowest] > priority:
+                return  # everything playing matters more
+            index = lowest
+
+        self.channels[index].play(self.cues[cue])
+        self.channel_priorities[index] = priority
+        self.latencies.append(time.perf_counter() - start)
+
+    def play_ambience(self, room_name):
+        """Streams the looping ambience for `room_name`, if its file exists."""
+        self.ambience_room = room_name
+        if not self.ensure_mixer():
+            return
+        filepath = AMBIENCE_FILES.get(room_name)
+        if not filepath or not os.path.exists(filepath):
+            pygame.mixer.music.fadeout(300)
+            return
+        try:
+            pygame.mixer.music.load(filepath)
+            pygame.mixer.music.play(-1, fade_ms=500)
+        except pygame.error:
+            print(f"Cannot stream ambience: {filepath}")
+
+    def latency_report(self):
+        """Returns the cost of triggering cues in milliseconds.
+
+        Only the Channel.play() call is timed. The mixer buffer adds up to
+        buffer_ms on top, which is the nominal size, not a measurement; the
+        output device adds its own unmeasured delay after that.
+        """
+        if not self.latencies:
+            return None
+        buffer_ms = AUDIO_BUFFER / AUDIO_FREQUENCY * 1000
+        call_ms = [latency * 1000 for latency in self.latencies]
+        return {
+            "cues": len(call_ms),
+            "call_avg_ms": sum(call_ms) / len(call_ms),
+            "call_max_ms": max(call_ms),
+            "buffer_ms": buffer_ms,
+        }
+
+class SessionStore:
+    """Keeps finished sessions in SQLite for the leaderboard and session history.
+
+    New sessions are queued and committed in batches by a background thread,
+    so the game over frame never waits on the disk; without `background`, or
+    where threads are not available (the browser build), they are written
+    inline. flush() waits for queued writes before reading. Sessions that
+    can't be written, e.g. while another program holds the database lock,
+    are kept and retried rather than dropped.
+
+    Pages use keyset pagination: the cursor is compared as a row value, so
+    SQLite searches the index straight to the page instead of scanning
+    every row before it.
+    """
+    def __init__(self, filepath=SESSION_DB, background=True):
+        self.filepath = filepath
+        self.queue = queue.Queue()
+        self.pending = []  # rows waiting for a successful write
+        self.connection = sqlite3.connect(filepath, timeout=SESSION_WRITE_TIMEOUT)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SESSION_SCHEMA)
+        self.connection.commit()
+        self.writer = None
+        if background:
+            try:
+                self.writer = threading.Thread(target=self.write_loop, daemon=True)
+                self.writer.start()
+            except RuntimeError:
+                self.writer = None
+
+    def record(self, player, score, title, badge, choices):
+        """Queues one finished session for writing."""
+        row = (player, score, title, badge, json.dumps(choices), time.time())
+        if self.writer:
+            self.queue.put(row)
+        else:
+            self.pending.append(row)
+            self.write_pending(self.connection)
+
+    def write_loop(self):
+        # SQLite connections belong to the thread that uses them
+        connection = sqlite3.connect(self.filepath, timeout=SESSION_WRITE_TIMEOUT)
+        running = True
+        while running:
+            # While sessions are held back, wake up now and then to retry them
+            try:
+                rows = [self.queue.get(timeout=SESSION_RETRY_INTERVAL if self.pending else None)]
+            except queue.Empty:
+                self.write_pending(connection)
+                continue
+            while len(rows) < SESSION_BATCH_SIZE:
+                try:
+                    rows.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                running = None not in rows
+                self.pending.extend(row for row in rows if row is not None)
+                self.write_pending(connection)
+            finally:
+                for _ in rows:
+                    self.queue.task_done()
+        if self.pending:
+            print(f"Could not save {len(self.pending)} sessions")
+        connection.close()
+
+    def write_pending(self, connection):
+        """Writes the held-back rows; on a database error keeps them for the next attempt."""
+        if not self.pending:
+            return
+        try:
+            self.write_rows(connection, self.pending)
+        except sqlite3.Error as message:
+            print(f"Cannot save sessions yet: {message}")
+            return
+        self.pending = []
+
+    def flush(self):
+        """Blocks until every queued session has been written or held back for a retry."""
+        if self.writer and self.writer.is_alive():
+            self.queue.join()
+
+    def write_rows(self, connection, rows):
+        with connection:
+            connection.executemany(
+                "INSERT INTO sessions (player, score, title, badge, choices, finished_at) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def top_page(self, after=None, limit=LEADERBOARD_PAGE_SIZE):
+        """Returns the next `limit` sessions by score, starting after the (score, id) cursor."""
+        if after is None:
+            return self.connection.execute(
+                "SELECT id, player, score, badge, finished_at FROM sessions "
+                "ORDER BY score DESC, id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return self.connection.execute(
+            "SELECT id, player, score, badge, finished_at FROM sessions "
+            "WHERE (score, id) < (?, ?) ORDER BY score DESC, id DESC LIMIT ?",
+            (after[0], after[1], limit),
+        ).fetchall()
+
+    def history_page(self, player, after=None, limit=LEADERBOARD_PAGE_SIZE):
+        """Returns `player`'s sessions, newest first, starting after the id cursor."""
+        return self.connection.execute(
+            "SELECT id, player, score, badge, finished_at FROM sessions "
+            "WHERE player = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (player, 2**63 - 1 if after is None else after, limit),
+        ).fetchall()
+
+    def count(self, player=None):
+        if player is None:
+            return self.connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return self.connection.execute("SELECT COUNT(*) FROM sessions WHERE player = ?", (player,)).fetchone()[0]
+
+    def close(self):
+        """Writes any queued sessions and closes the database."""
+        if self.writer:
+            self.queue.put(None)
+            self.writer.join()
+        else:
+            self.write_pending(self.connection)
+            if self.pending:
+                print(f"Could not save {len(self.pending)} sessions")
+        self.connection.close()
+
+class Game:
+    def __init__(self, sessions=None):
         # Initialization
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Eco Pixel Life")
@@ -148,6 +1184,8 @@ class Game:
         self.game_state = GAME_RUNNING
         self.show_end_game_dialog = False
 
+        self.day_stages = ["Morning", "Afternoon", "Evening"]
+
         # Load resources
         self.load_images()
 
@@ -168,40 +1206,79 @@ class Game:
         self.target_camera_offset_x = 0
         self.eco_score = 100
         self.day_stage = 0
-        self.day_stages = ["Morning", "Afternoon", "Evening"]
         self.active_bubble = None
         self.typing_text = ""
         self.target_text = ""
         self.typing_speed = 0.05
+        self.frame_clock = FrameClock()  # typewriter time, advanced by update() so replays match live play
         self.last_char_time = 0
         self.typing_index = 0
         self.selected_option = 0
         self.completed_interactions = []
 
+        # Cached render state so steady-state frames don't allocate
+        self.hud_state = None
+        self.hud_blits = []
+        self.bubble_point = None
+        self.bubble_chars = -1
+        self.bubble_text_blits = []
+        self.bubble_option_surfs = []
+        self.game_over_score = None
+        self.build_crt_effect()
+
+        # Session history and leaderboard
+        self.sessions = sessions
+        self.player_name = ""  # asked for at game over, then offered again next game
+        self.entering_name = False
+        self.name_input = ""
+        self.name_prompt_text = None
+        self.choices = []
+        self.session_saved = False
+        self.show_leaderboard = False
+        self.leaderboard_mode = LEADERBOARD_TOP
+        self.leaderboard_cursors = [None]
+        self.leaderboard_rows = []
+        self.leaderboard_has_next = False
+        self.leaderboard_total = 0
+
+        # Choice and transition feedback effects
+        self.particles = ParticleSystem()
+        self.audio = AudioManager()
+        self.step_frames = 0
+
         # Create interaction points
         self.create_interaction_points()
 
     def load_images(self):
+        # Every surface goes through the asset manager so it gets the cheapest format
+        self.assets = AssetManager()
+
         # Load player image
         try:
-            self.player_img = load_image('player_character.png', PLAYER_WIDTH, PLAYER_HEIGHT)
+            self.player_img = self.assets.load("player", 'player_character.png', PLAYER_WIDTH, PLAYER_HEIGHT)
         except:
-            self.player_img = pygame.Surface((PLAYER_WIDTH, PLAYER_HEIGHT), pygame.SRCALPHA)
-            pygame.draw.rect(self.player_img, LIME_GREEN, (0, 0, PLAYER_WIDTH, PLAYER_HEIGHT))
+            player_img = pygame.Surface((PLAYER_WIDTH, PLAYER_HEIGHT), pygame.SRCALPHA)
+            pygame.draw.rect(player_img, LIME_GREEN, (0, 0, PLAYER_WIDTH, PLAYER_HEIGHT))
+            self.player_img = self.assets.add("player", player_img)
         
-        # Room images
-        self.room_imgs = {}
+        # Room images, kept at their native size; lighting scales them as they are lit
+        room_imgs = {}
         room_names = ["bedroom", "bathroom", "kitchen", "living_room"]
         for room_name in room_names:
             try:
-                self.room_imgs[room_name] = load_image(f'{room_name}.png', ROOM_WIDTH, SCREEN_HEIGHT)
+                room_imgs[room_name] = self.assets.load(room_name, f'{room_name}.png', category="room")
             except:
-                self.room_imgs[room_name] = pygame.Surface((ROOM_WIDTH, SCREEN_HEIGHT))
-                self.room_imgs[room_name].fill(PASTEL_PINK)
+                room_img = pygame.Surface((ROOM_WIDTH // 8, SCREEN_HEIGHT // 8))
+                room_img.fill(PASTEL_PINK)
+                room_imgs[room_name] = self.assets.add(room_name, room_img, "room")
+
+        # Light the rooms for the time of day as they come into view
+        self.lighting = DayLighting(self.assets, room_imgs, self.day_stages)
 
         # Interaction point indicator
-        self.interaction_img = pygame.Surface((16, 16), pygame.SRCALPHA)
-        pygame.draw.circle(self.interaction_img, WHITE, (8, 8), 8)
+        interaction_img = pygame.Surface((16, 16), pygame.SRCALPHA)
+        pygame.draw.circle(interaction_img, WHITE, (8, 8), 8)
+        self.interaction_img = self.assets.add("interaction", interaction_img)
 
     def draw_loading_screen(self, progress=0):
         """Draw a custom loading screen with progress indicator"""
@@ -274,9 +1351,9 @@ class Game:
             {"text": "Turn on multiple lights to read", "score": -5, "next_stage": False}
         ])
 
-    def apply_crt_effect(self, surface):
-        """Apply a simplified CRT screen effect that's more performance-friendly"""
-        width, height = surface.get_width(), surface.get_height()
+    def build_crt_effect(self):
+        """Draw the CRT overlays once; apply_crt_effect only blits them"""
+        width, height = SCREEN_WIDTH, SCREEN_HEIGHT
         
         # Create a scanline overlay
         scanlines = pygame.Surface((width, height), pygame.SRCALPHA)
@@ -298,9 +1375,13 @@ class Game:
             alpha = int(120 * (1 - radius / max_radius))
             pygame.draw.circle(vignette, (0, 0, 0, alpha), center, radius, 20)
         
-        # Apply the effects
-        surface.blit(scanlines, (0, 0))
-        surface.blit(vignette, (0, 0))
+        self.crt_scanlines = self.assets.add("crt_scanlines", scanlines, "overlay")
+        self.crt_vignette = self.assets.add("crt_vignette", vignette, "overlay")
+
+    def apply_crt_effect(self, surface):
+        """Apply a simplified CRT screen effect that's more performance-friendly"""
+        surface.blit(self.crt_scanlines, (0, 0))
+        surface.blit(self.crt_vignette, (0, 0))
         
         return surface
 
@@ -355,6 +1436,7 @@ class Game:
                     self.current_room_index += 1
                     self.player.x = 0
                     self.target_camera_offset_x = self.current_room_index * ROOM_WIDTH
+                    self.emit_room_sparkles()
                 else:
                     # Stay in current room
                     self.player.x = ROOM_WIDTH - PLAYER_WIDTH
@@ -365,11 +1447,17 @@ class Game:
                     self.current_room_index -= 1
                     self.player.x = ROOM_WIDTH - PLAYER_WIDTH
                     self.target_camera_offset_x = self.current_room_index * ROOM_WIDTH
+                    self.emit_room_sparkles()
                 else:
                     # Stay in current room
                     self.player.x = 0
                     self.player.rect.x = 0
     
+    def emit_room_sparkles(self):
+        # Sparkle burst around the player as they enter a new room
+        player_global_x = self.player.x + (self.current_room_index * ROOM_WIDTH)
+        self.particles.emit(PARTICLE_SPARKLE, player_global_x + PLAYER_WIDTH/2, self.player.y + PLAYER_HEIGHT/2, 60)
+
     def update_room_transition(self):
         # Smoothly transition camera between rooms
         if self.camera_offset_x != self.target_camera_offset_x:
@@ -418,17 +1506,20 @@ class Game:
                 self.target_text = point.text
                 self.typing_text = ""
                 self.typing_index = 0
-                self.last_char_time = time.time()
+                self.last_char_time = self.frame_clock()
                 self.selected_option = 0
                 break
 
     def update_typing_text(self):
         # Typewriter effect for text bubbles
-        current_time = time.time()
+        current_time = self.frame_clock()
         if self.typing_index < len(self.target_text) and current_time - self.last_char_time >= self.typing_speed:
-            self.typing_text += self.target_text[self.typing_index]
+            char = self.target_text[self.typing_index]
+            self.typing_text += char
             self.typing_index += 1
             self.last_char_time = current_time
+            if char != " ":
+                self.audio.play("tick")
 
     def select_option(self):
         if not self.active_bubble:
@@ -440,9 +1531,19 @@ class Game:
         
         # Clamp eco score between 0 and 100
         self.eco_score = max(0, min(100, self.eco_score))
+
+        # Leaves and a rising jingle for eco-friendly choices, smoke for wasteful ones
+        point_x = self.rooms[self.current_room_index].x + self.active_bubble.x
+        if option["score"] > 0:
+            self.particles.emit(PARTICLE_LEAF, point_x, self.active_bubble.y, 80 + option["score"] * 8)
+            self.audio.play("good_choice")
+        else:
+            self.particles.emit(PARTICLE_SMOKE, point_x, self.active_bubble.y, 80 - option["score"] * 8)
+            self.audio.play("bad_choice")
         
         # Mark interaction as completed
         self.completed_interactions.append(self.active_bubble.name)
+        self.choices.append({"point": self.active_bubble.name, "option": option["text"], "score": option["score"]})
         
         # Advance day stage if needed
         if option.get("next_stage", False):
@@ -464,26 +1565,63 @@ class Game:
         pygame.draw.rect(self.screen, BABY_BLUE, (bubble_x, bubble_y, bubble_width, bubble_height))
         pygame.draw.rect(self.screen, WHITE, (bubble_x, bubble_y, bubble_width, bubble_height), 2)
         
+        # Re-wrap and re-render text only when a new character has been typed
+        if self.bubble_point is not self.active_bubble:
+            self.bubble_point = self.active_bubble
+            self.bubble_chars = -1
+            self.bubble_option_surfs = [self.font.render(option["text"], True, BLACK) for option in self.active_bubble.options]
+        if self.bubble_chars != len(self.typing_text):
+            self.bubble_chars = len(self.typing_text)
+            text_lines = wrap_text(self.typing_text, self.typewriter_font, bubble_width - 40)
+            self.bubble_text_blits = [
+                (self.typewriter_font.render(line, True, BLACK), (bubble_x + 20, bubble_y + 20 + i * 30))
+                for i, line in enumerate(text_lines)
+            ]
+
         # Draw text
-        text_lines = wrap_text(self.typing_text, self.typewriter_font, bubble_width - 40)
-        for i, line in enumerate(text_lines):
-            text_surf = self.typewriter_font.render(line, True, BLACK)
-            self.screen.blit(text_surf, (bubble_x + 20, bubble_y + 20 + i * 30))
+        self.screen.blits(self.bubble_text_blits, doreturn=False)
         
         # Draw options if text is fully typed
         if len(self.typing_text) == len(self.target_text):
             options_y = bubble_y + 100
-            for i, option in enumerate(self.active_bubble.options):
+            for i, option_surf in enumerate(self.bubble_option_surfs):
                 # Highlight selected option
                 if i == self.selected_option:
                     pygame.draw.rect(self.screen, LIME_GREEN, (bubble_x + 15, options_y + i * 30 - 5, bubble_width - 30, 25))
                 
-                option_surf = self.font.render(option["text"], True, BLACK)
                 self.screen.blit(option_surf, (bubble_x + 20, options_y + i * 30))
 
     def draw_game_over(self):
+        # The overlay and text only depend on the final score, so they are built once
+        if self.game_over_score != self.eco_score:
+            self.build_game_over()
+        self.screen.blit(self.game_over_overlay, (0, 0))
+        self.screen.blit(self.game_over_layer, self.game_over_pos)
+        if self.entering_name:
+            if self.name_prompt_text != self.name_input:
+                self.build_name_prompt()
+            self.screen.blit(self.name_prompt, self.name_prompt_pos)
+
+    def build_name_prompt(self):
+        # Covers the restart and quit buttons until the session has a name
+        panel_width = 420
+        panel_height = 124
+        panel = pygame.Surface((panel_width, panel_height)).convert()
+        panel.fill(BABY_BLUE)
+        pygame.draw.rect(panel, WHITE, (0, 0, panel_width, panel_height), 3)
+
+        lines = ("Enter your name for the leaderboard:", f"{self.name_input}_", "Press ENTER to save")
+        for i, line in enumerate(lines):
+            line_surf = self.font.render(line, True, BLACK if i == 1 else WHITE)
+            panel.blit(line_surf, (panel_width//2 - line_surf.get_width()//2, 20 + i * 32))
+
+        self.name_prompt = panel
+        self.name_prompt_pos = ((SCREEN_WIDTH - panel_width) // 2, (SCREEN_HEIGHT - 400) // 2 + 268)
+        self.name_prompt_text = self.name_input
+
+    def build_game_over(self):
         # Create pixel-style overlay with scanlines effect
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
         overlay.fill(BABY_BLUE)
         
         # Add scanlines for retro CRT effect
@@ -491,7 +1629,10 @@ class Game:
             pygame.draw.line(overlay, BLACK, (0, y), (SCREEN_WIDTH, y), 1)
         
         overlay.set_alpha(180)
-        self.screen.blit(overlay, (0, 0))
+        self.game_over_overlay = overlay
+
+        # Everything else goes on a transparent layer drawn over the overlay
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
         
         # Get score interpretation
         score_info = self.interpret_score()
@@ -503,32 +1644,32 @@ class Game:
         border_y = (SCREEN_HEIGHT - border_height) // 2
         
         # Draw outer border
-        pygame.draw.rect(self.screen, WHITE, (border_x-5, border_y-5, border_width+10, border_height+10), 5)
-        pygame.draw.rect(self.screen, BLACK, (border_x, border_y, border_width, border_height), 3)
+        pygame.draw.rect(layer, WHITE, (border_x-5, border_y-5, border_width+10, border_height+10), 5)
+        pygame.draw.rect(layer, BLACK, (border_x, border_y, border_width, border_height), 3)
         
         # Draw title
         title_font = pygame.font.Font(None, 48)
         title_surf = title_font.render("GAME OVER", True, WHITE)
-        self.screen.blit(title_surf, (SCREEN_WIDTH//2 - title_surf.get_width()//2, border_y + 30))
+        layer.blit(title_surf, (SCREEN_WIDTH//2 - title_surf.get_width()//2, border_y + 30))
         
         # Draw score title with nostalgic color
         score_title_surf = title_font.render(score_info["title"], True, score_info["color"])
-        self.screen.blit(score_title_surf, (SCREEN_WIDTH//2 - score_title_surf.get_width()//2, border_y + 80))
+        layer.blit(score_title_surf, (SCREEN_WIDTH//2 - score_title_surf.get_width()//2, border_y + 80))
         
         # Draw final score
         score_text = f"Final Eco Score: {self.eco_score}"
         score_surf = self.font.render(score_text, True, WHITE)
-        self.screen.blit(score_surf, (SCREEN_WIDTH//2 - score_surf.get_width()//2, border_y + 130))
+        layer.blit(score_surf, (SCREEN_WIDTH//2 - score_surf.get_width()//2, border_y + 130))
         
         # Draw badge
         badge_surf = self.font.render(f"Achievement: {score_info['badge']}", True, score_info["color"])
-        self.screen.blit(badge_surf, (SCREEN_WIDTH//2 - badge_surf.get_width()//2, border_y + 160))
+        layer.blit(badge_surf, (SCREEN_WIDTH//2 - badge_surf.get_width()//2, border_y + 160))
         
         # Draw description (wrapped text)
         desc_lines = wrap_text(score_info["description"], self.font, border_width - 80)
         for i, line in enumerate(desc_lines):
             desc_surf = self.font.render(line, True, WHITE)
-            self.screen.blit(desc_surf, (SCREEN_WIDTH//2 - desc_surf.get_width()//2, border_y + 200 + i * 25))
+            layer.blit(desc_surf, (SCREEN_WIDTH//2 - desc_surf.get_width()//2, border_y + 200 + i * 25))
         
         # Draw instructions with pixel-style buttons
         restart_text = "Press ENTER to play again"
@@ -540,9 +1681,9 @@ class Game:
         button_x = SCREEN_WIDTH//2 - button_width//2
         button_y = border_y + 280
         
-        pygame.draw.rect(self.screen, LIME_GREEN, (button_x, button_y, button_width, button_height))
-        pygame.draw.rect(self.screen, WHITE, (button_x, button_y, button_width, button_height), 2)
-        self.screen.blit(restart_surf, (button_x + 10, button_y + 5))
+        pygame.draw.rect(layer, LIME_GREEN, (button_x, button_y, button_width, button_height))
+        pygame.draw.rect(layer, WHITE, (button_x, button_y, button_width, button_height), 2)
+        layer.blit(restart_surf, (button_x + 10, button_y + 5))
         
         # Quit button
         quit_text = "Press ESC to quit"
@@ -553,17 +1694,37 @@ class Game:
         button_x = SCREEN_WIDTH//2 - button_width//2
         button_y = border_y + 330
         
-        pygame.draw.rect(self.screen, CORAL, (button_x, button_y, button_width, button_height))
-        pygame.draw.rect(self.screen, WHITE, (button_x, button_y, button_width, button_height), 2)
-        self.screen.blit(quit_surf, (button_x + 10, button_y + 5))      
+        pygame.draw.rect(layer, CORAL, (button_x, button_y, button_width, button_height))
+        pygame.draw.rect(layer, WHITE, (button_x, button_y, button_width, button_height), 2)
+        layer.blit(quit_surf, (button_x + 10, button_y + 5))
+
+        # Leaderboard hint
+        if self.sessions:
+            board_surf = self.font.render("Press L for leaderboard", True, WHITE)
+            layer.blit(board_surf, (SCREEN_WIDTH//2 - board_surf.get_width()//2, border_y + 372))
+
+        # Keep only the drawn area of the layer
+        bounds = layer.get_bounding_rect()
+        self.game_over_layer = layer.subsurface(bounds)
+        self.game_over_pos = bounds.topleft
+        self.game_over_score = self.eco_score
 
     def reset_game(self):
+        if not self.session_saved:
+            self.store_session()
+
         # Reset game state
         self.game_state = GAME_RUNNING
         self.eco_score = 100
         self.day_stage = 0
         self.active_bubble = None
         self.completed_interactions = []
+        self.choices = []
+        self.session_saved = False
+        self.entering_name = False
+        self.show_leaderboard = False
+        self.particles.clear()
+        self.lighting.reset()
         
         # Reset player position
         self.player.x = SCREEN_WIDTH // 2
@@ -576,6 +1737,101 @@ class Game:
         self.camera_offset_x = 0
         self.target_camera_offset_x = 0
     
+    def store_session(self):
+        # Keep the finished session for the leaderboard; the write happens off this frame
+        self.session_saved = True
+        if self.sessions:
+            score_info = self.interpret_score()
+            self.sessions.record(self.player_name, self.eco_score, score_info["title"], score_info["badge"], self.choices)
+
+    def confirm_name(self):
+        self.player_name = self.name_input.strip() or self.player_name or "Player"
+        self.entering_name = False
+        self.store_session()
+
+    def store_unsaved_session(self):
+        # Closing the window at the name prompt keeps the session under the name typed so far
+        if self.game_state == GAME_OVER and not self.session_saved:
+            if not self.entering_name:
+                self.name_input = self.player_name
+            self.confirm_name()
+
+    def open_leaderboard(self, mode):
+        # Sessions are written in the background; make sure the latest one is in
+        self.sessions.flush()
+        self.show_leaderboard = True
+        self.leaderboard_mode = mode
+        self.leaderboard_cursors = [None]
+        if mode == LEADERBOARD_TOP:
+            self.leaderboard_total = self.sessions.count()
+        else:
+            self.leaderboard_total = self.sessions.count(self.player_name)
+        self.load_leaderboard_page()
+
+    def change_leaderboard_page(self, step):
+        if step > 0 and self.leaderboard_has_next:
+            last = self.leaderboard_rows[-1]
+            if self.leaderboard_mode == LEADERBOARD_TOP:
+                self.leaderboard_cursors.append((last[2], last[0]))
+            else:
+                self.leaderboard_cursors.append(last[0])
+            self.load_leaderboard_page()
+        elif step < 0 and len(self.leaderboard_cursors) > 1:
+            self.leaderboard_cursors.pop()
+            self.load_leaderboard_page()
+
+    def load_leaderboard_page(self):
+        # Fetch one extra row to know whether there is a next page
+        cursor = self.leaderboard_cursors[-1]
+        if self.leaderboard_mode == LEADERBOARD_TOP:
+            rows = self.sessions.top_page(cursor, LEADERBOARD_PAGE_SIZE + 1)
+        else:
+            rows = self.sessions.history_page(self.player_name, cursor, LEADERBOARD_PAGE_SIZE + 1)
+        self.leaderboard_rows = rows[:LEADERBOARD_PAGE_SIZE]
+        self.leaderboard_has_next = len(rows) > LEADERBOARD_PAGE_SIZE
+        self.build_leaderboard()
+
+    def build_leaderboard(self):
+        # Pixel-style panel matching the game over screen
+        panel_width = 600
+        panel_height = 400
+        panel = pygame.Surface((panel_width, panel_height)).convert()
+        panel.fill(BABY_BLUE)
+        pygame.draw.rect(panel, WHITE, (0, 0, panel_width, panel_height), 5)
+
+        # Draw title
+        if self.leaderboard_mode == LEADERBOARD_TOP:
+            title = "Top Scores"
+        else:
+            title = f"History: {self.player_name}"
+        title_font = pygame.font.Font(None, 48)
+        title_surf = title_font.render(title, True, WHITE)
+        panel.blit(title_surf, (panel_width//2 - title_surf.get_width()//2, 20))
+
+        # Draw one line per session
+        page = len(self.leaderboard_cursors) - 1
+        for i, (session_id, player, score, badge, finished_at) in enumerate(self.leaderboard_rows):
+            if self.leaderboard_mode == LEADERBOARD_TOP:
+                label = f"{page * LEADERBOARD_PAGE_SIZE + i + 1}. {player}"
+            else:
+                label = time.strftime("%Y-%m-%d %H:%M", time.localtime(finished_at))
+            y = 80 + i * 26
+            panel.blit(self.font.render(label, True, BLACK), (30, y))
+            panel.blit(self.font.render(str(score), True, BLACK), (300, y))
+            panel.blit(self.font.render(badge, True, BLACK), (360, y))
+        if not self.leaderboard_rows:
+            empty_surf = self.font.render("No sessions yet", True, BLACK)
+            panel.blit(empty_surf, (panel_width//2 - empty_surf.get_width()//2, 160))
+
+        # Draw page info and controls
+        pages = max(1, math.ceil(self.leaderboard_total / LEADERBOARD_PAGE_SIZE))
+        footer = f"Page {page + 1}/{pages}  LEFT/RIGHT: page  TAB: {'history' if self.leaderboard_mode == LEADERBOARD_TOP else 'top scores'}  L: close"
+        footer_surf = self.font.render(footer, True, WHITE)
+        panel.blit(footer_surf, (panel_width//2 - footer_surf.get_width()//2, panel_height - 40))
+
+        self.leaderboard_panel = panel
+        self.leaderboard_pos = ((SCREEN_WIDTH - panel_width) // 2, (SCREEN_HEIGHT - panel_height) // 2)
+
     def interpret_score(self):
         """Returns a detailed interpretation of the player's eco score"""
         if self.eco_score >= 90:
@@ -612,7 +1868,17 @@ class Game:
         }
     
     def draw_ui(self):
-    # Draw eco score with gradient color based on score
+        # HUD surfaces are cached and only rebuilt when a value they show changes
+        hud_state = (self.eco_score, self.day_stage, self.current_room_index, self.active_bubble is None)
+        if hud_state != self.hud_state:
+            self.hud_state = hud_state
+            self.build_ui()
+        self.screen.blits(self.hud_blits, doreturn=False)
+
+    def build_ui(self):
+        blits = []
+
+        # Draw eco score with gradient color based on score
         score_text = f"Eco Score: {self.eco_score}"
         
         # Color changes based on score value
@@ -627,14 +1893,11 @@ class Game:
         
         score_surf = self.font.render(score_text, True, score_color)
         
-        # Create a small background panel for the score
-        score_panel = pygame.Surface((score_surf.get_width() + 20, score_surf.get_height() + 10))
-        score_panel.fill(BABY_BLUE)
-        pygame.draw.rect(score_panel, WHITE, (0, 0, score_panel.get_width(), score_panel.get_height()), 2)
-        score_panel.set_alpha(220)  # Slight transparency
+        # Small background panel for the score, with slight transparency
+        score_panel = self.assets.panel(score_surf.get_width() + 20, score_surf.get_height() + 10, BABY_BLUE, 220)
     
-        self.screen.blit(score_panel, (SCREEN_WIDTH - score_panel.get_width() - 5, 5))
-        self.screen.blit(score_surf, (SCREEN_WIDTH - score_surf.get_width() - 15, 10))
+        blits.append((score_panel, (SCREEN_WIDTH - score_panel.get_width() - 5, 5)))
+        blits.append((score_surf, (SCREEN_WIDTH - score_surf.get_width() - 15, 10)))
 
         # Draw day progress with pixel-style panel
         if self.day_stage < len(self.day_stages):
@@ -643,38 +1906,34 @@ class Game:
             day_text = "Time: End of Day"
         day_surf = self.font.render(day_text, True, WHITE)
         
-        # Create a small background panel
-        day_panel = pygame.Surface((day_surf.get_width() + 20, day_surf.get_height() + 10))
-        day_panel.fill(PASTEL_PINK)
-        pygame.draw.rect(day_panel, WHITE, (0, 0, day_panel.get_width(), day_panel.get_height()), 2)
+        # Small background panel
+        day_panel = self.assets.panel(day_surf.get_width() + 20, day_surf.get_height() + 10, PASTEL_PINK)
         
-        self.screen.blit(day_panel, (5, 5))
-        self.screen.blit(day_surf, (15, 10))
+        blits.append((day_panel, (5, 5)))
+        blits.append((day_surf, (15, 10)))
         
         # Draw room name with pixel-style border
         room_name = self.rooms[self.current_room_index].title
         room_surf = self.font.render(f"Room: {room_name}", True, BLACK)
         
-        # Create background panel
-        room_panel = pygame.Surface((room_surf.get_width() + 20, room_surf.get_height() + 10))
-        room_panel.fill(LIME_GREEN)
-        pygame.draw.rect(room_panel, WHITE, (0, 0, room_panel.get_width(), room_panel.get_height()), 2)
+        # Background panel
+        room_panel = self.assets.panel(room_surf.get_width() + 20, room_surf.get_height() + 10, LIME_GREEN)
         
-        self.screen.blit(room_panel, (5, 45))
-        self.screen.blit(room_surf, (15, 50))
+        blits.append((room_panel, (5, 45)))
+        blits.append((room_surf, (15, 50)))
         
         # Draw hint text with pixel-style border at bottom
         if not self.active_bubble:
             hint_text = "Press SPACE near objects to interact"
             hint_surf = self.font.render(hint_text, True, WHITE)
             
-            # Create background panel
-            hint_panel = pygame.Surface((hint_surf.get_width() + 20, hint_surf.get_height() + 10))
-            hint_panel.fill(DARK_CORAL)
-            pygame.draw.rect(hint_panel, WHITE, (0, 0, hint_panel.get_width(), hint_panel.get_height()), 2)
+            # Background panel
+            hint_panel = self.assets.panel(hint_surf.get_width() + 20, hint_surf.get_height() + 10, DARK_CORAL)
             
-            self.screen.blit(hint_panel, (SCREEN_WIDTH//2 - hint_panel.get_width()//2, SCREEN_HEIGHT - hint_panel.get_height() - 5))
-            self.screen.blit(hint_surf, (SCREEN_WIDTH//2 - hint_surf.get_width()//2, SCREEN_HEIGHT - hint_surf.get_height() - 10))
+            blits.append((hint_panel, (SCREEN_WIDTH//2 - hint_panel.get_width()//2, SCREEN_HEIGHT - hint_panel.get_height() - 5)))
+            blits.append((hint_surf, (SCREEN_WIDTH//2 - hint_surf.get_width()//2, SCREEN_HEIGHT - hint_surf.get_height() - 10)))
+
+        self.hud_blits = blits
 
     def handle_event(self, event):
         if event.type == pygame.QUIT:
@@ -697,9 +1956,34 @@ class Game:
                     self.show_end_game_dialog = False
             return
 
-        if self.game_state == GAME_OVER:
+        if self.show_leaderboard:
+            if event.type == pygame.KEYDOWN:
+                if event.key in (pygame.K_l, pygame.K_ESCAPE):
+                    self.show_leaderboard = False
+                elif event.key == pygame.K_TAB:
+                    other = LEADERBOARD_HISTORY if self.leaderboard_mode == LEADERBOARD_TOP else LEADERBOARD_TOP
+                    self.open_leaderboard(other)
+                elif event.key == pygame.K_RIGHT:
+                    self.change_leaderboard_page(1)
+                elif event.key == pygame.K_LEFT:
+                    self.change_leaderboard_page(-1)
+            return
+
+        if self.entering_name:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN:
+                    self.confirm_name()
+                elif event.key == pygame.K_BACKSPACE:
+                    self.name_input = self.name_input[:-1]
+                elif event.unicode.isprintable() and event.unicode and len(self.name_input) < PLAYER_NAME_MAX:
+                    self.name_input += event.unicode
+            return
+
+        if self.game_state == GAME_OVER:
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_l and self.sessions:
+                    self.open_leaderboard(LEADERBOARD_TOP)
+                elif event.key == pygame.K_RETURN:
                     self.reset_game()
                 elif event.key == pygame.K_ESCAPE:
                     pygame.quit()
@@ -719,8 +2003,31 @@ class Game:
         if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
             self.check_interaction()
 
-    def update(self):
+        # Print asset memory usage and measured blit cost per surface format
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+            self.assets.measure_blit_costs(self.screen)
+            self.assets.print_memory_report()
+
+        # Print the measured cost of triggering sound cues
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            report = self.audio.latency_report()
+            if report:
+                print(f"Audio cues: {report['cues']}, play() call avg {report['call_avg_ms']:.2f} ms, "
+                      f"max {report['call_max_ms']:.2f} ms, plus up to {report['buffer_ms']:.1f} ms "
+                      f"nominal mixer buffer (device latency not measured)")
+
+    def update(self, keys=None):
+        self.frame_clock.frame += 1
+
+        # Effects keep animating behind dialogs and the game over screen
+        self.particles.update()
+        self.lighting.update(self.day_stage)
+
         if self.game_state == GAME_OVER:
+            # Ask who played; the session is stored once the name is confirmed
+            if self.sessions and not self.session_saved and not self.entering_name:
+                self.entering_name = True
+                self.name_input = self.player_name
             return
 
         if self.active_bubble:
@@ -728,7 +2035,8 @@ class Game:
             return
 
         # Move player
-        keys = pygame.key.get_pressed()
+        if keys is None:
+            keys = pygame.key.get_pressed()
         if keys[pygame.K_LEFT]:
             self.player.move(-PLAYER_SPEED, 0)
         if keys[pygame.K_RIGHT]:
@@ -738,9 +2046,22 @@ class Game:
         if keys[pygame.K_DOWN]:
             self.player.move(0, PLAYER_SPEED)
 
+        # Footsteps while walking
+        if keys[pygame.K_LEFT] or keys[pygame.K_RIGHT] or keys[pygame.K_UP] or keys[pygame.K_DOWN]:
+            self.step_frames += 1
+            if self.step_frames % FOOTSTEP_INTERVAL == 1:
+                self.audio.play("footstep")
+        else:
+            self.step_frames = 0
+
         # Check room boundaries
         self.check_room_boundaries()
 
+        # Switch ambience when entering a new room
+        room_name = self.rooms[self.current_room_index].name
+        if self.audio.ambience_room != room_name:
+            self.audio.play_ambience(room_name)
+
         # Update room transition
         self.update_room_transition()
 
@@ -756,7 +2077,7 @@ class Game:
         for room in self.rooms:
             room_x = room.x - self.camera_offset_x
             if -ROOM_WIDTH < room_x < SCREEN_WIDTH:
-                self.screen.blit(self.room_imgs[room.name], (room_x, 0))
+                self.lighting.draw(self.screen, room.name, room_x)
 
                 # Draw interaction points
                 for point in room.interaction_points:
@@ -769,6 +2090,9 @@ class Game:
         player_x = self.player.x + (self.current_room_index * ROOM_WIDTH) - self.camera_offset_x
         self.screen.blit(self.player.image, (int(player_x), self.player.y))
 
+        # Draw particle effects
+        self.particles.draw(self.screen, self.camera_offset_x)
+
         # Draw UI
         self.draw_ui()
 
@@ -779,6 +2103,10 @@ class Game:
         # Draw game over screen
         if self.game_state == GAME_OVER:
             self.draw_game_over()
+
+        # Draw leaderboard over the game over screen
+        if self.show_leaderboard:
+            self.screen.blit(self.leaderboard_panel, self.leaderboard_pos)
             
         # Draw end game dialog if active
         if self.show_end_game_dialog:
@@ -790,10 +2118,225 @@ class Game:
         # Update the display
         pygame.display.flip()
 
+# Allocation instrumentation
+class FrameProfiler:
+    """Reports allocations and GC collections per frame, broken down by Game method.
+
+    Each listed method of the game is wrapped so its calls record the bytes
+    allocated while running (tracemalloc peak) and the bytes still held on
+    return. Nested calls are included in their caller's numbers, and the
+    wrapper's own bookkeeping adds a few dozen retained bytes per call.
+    Collections are counted per generation through gc.callbacks.
+    """
+    METHODS = (
+        "update", "render", "draw_ui", "draw_bubble", "draw_game_over",
+        "apply_crt_effect", "update_typing_text", "check_day_progress",
+    )
+
+    def __init__(self, game, report_every=FPS * 5):
+        self.report_every = report_every
+        self.frames = 0
+        self.stats = {name: [0, 0, 0] for name in self.METHODS}  # calls, allocated bytes, retained bytes
+        self.collections = [0, 0, 0]
+        self.peaks = []  # highest peak seen by nested calls, per active call
+        tracemalloc.start()
+        gc.callbacks.append(self.on_gc)
+        for name in self.METHODS:
+            setattr(game, name, self.wrap(name, getattr(game, name)))
+
+    def wrap(self, name, method):
+        stats = self.stats[name]
+        peaks = self.peaks
+
+        def profiled(*args, **kwargs):
+            start, peak = tracemalloc.get_traced_memory()
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak)
+            peaks.append(start)
+            tracemalloc.reset_peak()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                end, peak = tracemalloc.get_traced_memory()
+                peak = max(peak, peaks.pop())
+                if peaks:
+                    peaks[-1] = max(peaks[-1], peak)
+                stats[0] += 1
+                stats[1] += peak - start
+                stats[2] += end - start
+        return profiled
+
+    def on_gc(self, phase, info):
+        if phase == "start":
+            self.collections[info["generation"]] += 1
+
+    def end_frame(self):
+        self.frames += 1
+        if self.frames >= self.report_every:
+            self.print_report()
+            self.reset()
+
+    def print_report(self):
+        gen0, gen1, gen2 = (count / self.frames for count in self.collections)
+        print(f"Frames: {self.frames}, GC per frame: gen0 {gen0:.3f} gen1 {gen1:.3f} gen2 {gen2:.3f}")
+        for name, (calls, allocated, retained) in self.stats.items():
+            if calls:
+                print(f"  {name}: {calls / self.frames:.2f} calls, "
+                      f"{allocated / self.frames / 1024:.1f} KiB allocated, "
+                      f"{retained / self.frames:+.0f} B retained per frame")
+
+    def reset(self):
+        self.frames = 0
+        self.collections = [0, 0, 0]
+        for stats in self.stats.values():
+            stats[:] = [0, 0, 0]
+
+    def stop(self):
+        gc.callbacks.remove(self.on_gc)
+        tracemalloc.stop()
+
+# Offline frame export
+class HeldKeys:
+    """Stands in for pygame.key.get_pressed() during replay."""
+    def __init__(self, keys):
+        self.keys = set(keys)
+
+    def __getitem__(self, key):
+        return key in self.keys
+
+class FrameClock:
+    """Time source that advances one frame per update instead of following the wall clock."""
+    def __init__(self):
+        self.frame = 0
+
+    def __call__(self):
+        return self.frame / FPS
+
+def replay_frame(game, frame_input):
+    """Feeds one recorded frame of input into the game and advances it."""
+    for event in frame_input["events"]:
+        # Older recordings hold bare key codes without the typed text
+        key, text = event if isinstance(event, list) else (event, "")
+        game.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=text))
+    game.update(HeldKeys(frame_input["keys"]))
+
+def diff_frame(surface, golden_path):
+    """Returns the fraction of pixels that differ from a golden image (1.0 if it is missing)."""
+    if not os.path.exists(golden_path):
+        return 1.0
+    golden = pygame.image.load(golden_path)
+    if golden.get_size() != surface.get_size():
+        return 1.0
+    if np is None:
+        same = pygame.image.tobytes(golden, "RGB") == pygame.image.tobytes(surface, "RGB")
+        return 0.0 if same else 1.0
+    diff = pygame.surfarray.array3d(golden) != pygame.surfarray.array3d(surface)
+    return float(np.count_nonzero(diff.any(axis=2))) / (surface.get_width() * surface.get_height())
+
+def replay_game(seed, sessions):
+    """Builds a silent Game that replays a recorded session the way it was played.
+
+    A session recorded with a store gets an in-memory one, so the name
+    prompt and leaderboard swallow the same keys they did live without
+    touching the real database.
+    """
+    store = SessionStore(":memory:", background=False) if sessions and sqlite3 is not None else None
+    game = Game(store)
+    game.particles = ParticleSystem(seed=seed)
+    game.audio.enabled = False
+    return game
+
+def export_segment(frames, seed, sessions, start, end, out_dir, raw, golden_dir):
+    """Re-simulates a session up to `start` and renders frames start..end-1.
+
+    Runs in a worker process. Returns {frame index: differing pixel fraction}
+    for every frame compared against a golden image.
+    """
+    game = replay_game(seed, sessions)
+    diffs = {}
+    stream = open(os.path.join(out_dir, f"segment_{start:06d}.rgb"), "wb") if raw else None
+    try:
+        for index in range(end):
+            try:
+                replay_frame(game, frames[index])
+            except SystemExit:
+                break  # the session quit the game
+            if index < start:
+                continue
+
+            game.render()
+            if raw:
+                stream.write(pygame.image.tobytes(game.screen, "RGB"))
+            else:
+                pygame.image.save(game.screen, os.path.join(out_dir, f"frame_{index:06d}.png"))
+            if golden_dir:
+                diffs[index] = diff_frame(game.screen, os.path.join(golden_dir, f"frame_{index:06d}.png"))
+    finally:
+        if stream:
+            stream.close()
+        if game.sessions:
+            game.sessions.close()
+    return diffs
+
+def export_session(session_path, out_dir, raw=False, workers=None, golden_dir=None, tolerance=0.0):
+    """Renders a recorded session to PNG frames or one raw RGB stream using a process pool.
+
+    The session is split into one contiguous segment per worker; each worker
+    re-simulates from the first frame so segments need no shared state.
+    Returns the indices of frames that differ from their golden image by more
+    than `tolerance`.
+    """
+    session = load_session(session_path)
+    frames = session["frames"]
+    sessions = session.get("sessions", sqlite3 is not None)
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(frames)))
+    bounds = [len(frames) * i // workers for i in range(workers + 1)]
+
+    diffs = {}
+    with ProcessPoolExecutor(workers) as pool:
+        jobs = [
+            pool.submit(export_segment, frames, session["seed"], sessions, bounds[i], bounds[i + 1], out_dir, raw, golden_dir)
+            for i in range(workers)
+        ]
+        for job in jobs:
+            diffs.update(job.result())
+
+    # Stitch the per-segment streams into a single file in frame order
+    if raw:
+        with open(os.path.join(out_dir, "frames.rgb"), "wb") as stream:
+            for start in bounds[:-1]:
+                segment_path = os.path.join(out_dir, f"segment_{start:06d}.rgb")
+                with open(segment_path, "rb") as segment:
+                    stream.write(segment.read())
+                os.remove(segment_path)
+        print(f"Wrote {len(frames)} frames ({SCREEN_WIDTH}x{SCREEN_HEIGHT} rgb24) to {out_dir}/frames.rgb")
+    else:
+        print(f"Wrote {len(frames)} frames to {out_dir}")
+
+    failures = sorted(index for index, diff in diffs.items() if diff > tolerance)
+    if golden_dir:
+        print(f"{len(failures)} of {len(diffs)} frames differ from {golden_dir}")
+    return failures
+
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Eco Pixel Life")
+    parser.add_argument("--record", metavar="SESSION", help="record this play session's input to a file")
+    parser.add_argument("--export", nargs=2, metavar=("SESSION", "OUT_DIR"), help="render a recorded session to frames")
+    parser.add_argument("--raw", action="store_true", help="export one raw RGB stream instead of PNG frames")
+    parser.add_argument("--workers", type=int, help="export processes (default: one per core)")
+    parser.add_argument("--golden", metavar="DIR", help="compare exported frames with golden PNGs in DIR")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="allowed fraction of differing pixels")
+    parser.add_argument("--profile-alloc", action="store_true", help="report allocations and GC collections per frame")
+    parser.add_argument("--no-gc-tuning", action="store_true", help="keep the default garbage collector settings")
+    args, _ = parser.parse_known_args()
+
+    if args.export:
+        failures = export_session(args.export[0], args.export[1], args.raw, args.workers, args.golden, args.tolerance)
+        sys.exit(1 if failures else 0)
+
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.record, args.profile_alloc, not args.no_gc_tuning))
     except Exception as e:
         print(f"Error: {e}")
     finally:
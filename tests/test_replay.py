@@ -0,0 +1,67 @@
+"""Replays must stay in step with live play across a game over.
+
+Plays a short script against a game with a real session store, records
+it the way main() does, replays the recording the way export does and
+compares the game state after every frame.
+"""
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame  # noqa: E402
+import main  # noqa: E402
+
+pytestmark = pytest.mark.skipif(main.sqlite3 is None, reason="needs sqlite3")
+
+WALK = [{"keys": [pygame.K_DOWN], "events": []}] * 5
+IDLE = {"keys": [], "events": []}
+
+
+def press(key, text=""):
+    return {"keys": [], "events": [[key, text]]}
+
+
+# Walk, end the day early, name the session, look at the leaderboard, play again
+SCRIPT = WALK + [
+    press(pygame.K_ESCAPE), press(pygame.K_y), IDLE,
+    press(pygame.K_a, "a"), press(pygame.K_l, "l"), press(pygame.K_RETURN, "\r"),
+    press(pygame.K_l, "l"), press(pygame.K_RETURN, "\r"), press(pygame.K_RIGHT), press(pygame.K_l, "l"),
+    press(pygame.K_RETURN, "\r"),
+] + WALK
+
+
+def state(game):
+    return (
+        game.game_state, game.player.x, game.player.y, game.eco_score, game.day_stage,
+        game.entering_name, game.name_input, game.show_leaderboard, game.session_saved,
+    )
+
+
+@pytest.fixture
+def chdir_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
+
+
+def test_replay_matches_live_play_across_game_over(chdir_root, tmp_path):
+    store = main.SessionStore(str(tmp_path / "sessions.db"))
+    live = main.Game(store)
+    live.audio.enabled = False
+    live_states = []
+    for frame in SCRIPT:
+        main.replay_frame(live, frame)
+        live_states.append(state(live))
+    store.close()
+    assert live.player_name == "al"
+    assert live.game_state == main.GAME_RUNNING
+
+    replay = main.replay_game(live.particles.seed, sessions=True)
+    for index, frame in enumerate(SCRIPT):
+        main.replay_frame(replay, frame)
+        assert state(replay) == live_states[index], f"replay diverged at frame {index}"
+    replay.sessions.close()
@@ -0,0 +1,56 @@
+"""Session writes must survive another program holding the database lock."""
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main  # noqa: E402
+
+pytestmark = pytest.mark.skipif(main.sqlite3 is None, reason="needs sqlite3")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "SESSION_WRITE_TIMEOUT", 0.1)
+    monkeypatch.setattr(main, "SESSION_RETRY_INTERVAL", 0.1)
+    store = main.SessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+
+def test_locked_database_holds_sessions_back_until_it_is_free(store):
+    blocker = main.sqlite3.connect(store.filepath)
+    blocker.execute("BEGIN IMMEDIATE")
+
+    store.record("al", 90, "title", "badge", [])
+    start = time.perf_counter()
+    store.flush()
+    assert time.perf_counter() - start < 2, "flush() waited on the locked database"
+    assert store.writer.is_alive()
+    assert store.count() == 0
+
+    blocker.rollback()
+    blocker.close()
+    store.record("bo", 80, "title", "badge", [])
+    store.flush()
+    assert store.count() == 2
+
+
+def test_closing_at_the_name_prompt_keeps_the_session(store, monkeypatch):
+    monkeypatch.chdir(ROOT)
+    game = main.Game(store)
+    game.audio.enabled = False
+    game.game_state = main.GAME_OVER
+    game.update()
+    assert game.entering_name
+    game.name_input = "al"
+
+    game.store_unsaved_session()
+    store.flush()
+    assert store.top_page()[0][1:3] == ("al", game.eco_score)
@@ -0,0 +1,109 @@
+"""Steady-state frames must not allocate.
+
+Walks back and forth in the first room, the way an idle player does, and
+checks each frame of update() + render() for three kinds of allocation:
+
+- SDL surfaces, which tracemalloc can't see, by counting every pygame call
+  that makes a new Surface
+- Python objects alive at the same time, via the per-frame tracemalloc peak
+- container objects left behind, via gc.get_count() with the collector off
+"""
+import gc
+import os
+import sys
+import tracemalloc
+import types
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame  # noqa: E402
+import main  # noqa: E402
+
+FRAMES = main.FPS * 5
+MAX_FRAME_PEAK = 384  # bytes of Python objects alive at once within a frame
+MAX_GC_OBJECTS = 16  # container objects allowed to survive all measured frames
+# pygame functions and methods that return a new Surface, by module
+SURFACE_MAKERS = {
+    "pygame.surface": {"copy", "convert", "convert_alpha", "subsurface"},
+    "pygame.font": {"render"},
+    "pygame.transform": {"scale", "smoothscale", "rotate", "rotozoom", "flip"},
+    "pygame.image": {"load", "frombuffer", "frombytes", "fromstring"},
+}
+
+
+@pytest.fixture
+def game(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    game = main.Game()
+    game.audio.enabled = False
+
+    # Warm up so the HUD, panels and overlays are already cached
+    for keys in walk(main.FPS * 2):
+        game.update(keys)
+        game.render()
+    return game
+
+
+def walk(frames):
+    held = (main.HeldKeys([pygame.K_LEFT]), main.HeldKeys([pygame.K_RIGHT]))
+    for index in range(frames):
+        yield held[index // 30 % 2]
+
+
+def makes_surface(function):
+    owner = function.__self__
+    module = owner.__name__ if isinstance(owner, types.ModuleType) else type(owner).__module__
+    return function.__name__ in SURFACE_MAKERS.get(module, ())
+
+
+def test_steady_state_frames_make_no_surfaces(game, monkeypatch):
+    made = []
+    def on_call(frame, event, function):
+        if event == "c_call" and makes_surface(function):
+            made.append(function.__name__)
+
+    class CountedSurface(pygame.Surface):
+        def __init__(self, *args, **kwargs):
+            made.append("Surface")
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(pygame, "Surface", CountedSurface)
+    sys.setprofile(on_call)
+    try:
+        for keys in walk(FRAMES):
+            game.update(keys)
+            game.render()
+    finally:
+        sys.setprofile(None)
+
+    assert not made, f"{len(made)} surfaces made over {FRAMES} frames: {sorted(set(made))}"
+
+
+def test_steady_state_frames_allocate_no_python_objects(game):
+    peaks = []
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        # The first traced frame pays for tracemalloc's own bookkeeping
+        game.update(next(walk(1)))
+        game.render()
+        start = gc.get_count()[0]
+        for keys in walk(FRAMES):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            game.update(keys)
+            game.render()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+        survivors = gc.get_count()[0] - start
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+
+    assert max(peaks) <= MAX_FRAME_PEAK, f"a frame peaked at {max(peaks)} bytes"
+    assert survivors <= MAX_GC_OBJECTS, f"{survivors} container objects survived {FRAMES} frames"